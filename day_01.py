@@ -1,4 +1,88 @@
 #!/usr/bin/env -S pdm run python
+import re
+import numpy as np
+
+DIGITS = {str(n): n for n in range(10)}
+DIGIT_WORDS = DIGITS | {word: n for n, word in enumerate("one two three four five six seven eight nine".split(), start=1)}
+
+class DigitScanner:
+    r"""
+    Finds the first and last digit in a line, where a "digit" is any of the
+    keys in `words`. Matches are allowed to overlap, so eg "twone" has a first
+    digit of 2 and a last digit of 1.
+
+    >>> scanner = DigitScanner(DIGIT_WORDS)
+    >>> scanner.first("xtwone3four"), scanner.last("xtwone3four")
+    (2, 4)
+    >>> scanner.first("zoneight"), scanner.last("zoneight")
+    (1, 8)
+    >>> scanner.calibration_value("7pqrstsixteen")
+    76
+    """
+    def __init__(self, words: dict[str, int]):
+        self.words = words
+        alternatives = "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+        # No word is a substring of another, so the leftmost match is the first digit.
+        # For the last one, a greedy .* runs to the end of the line and then backtracks
+        # one character at a time until a word matches - ie it scans in reverse and stops
+        # at the first hit, without ever needing to copy the line
+        self.forward = re.compile(alternatives)
+        self.backward = re.compile(f".*({alternatives})")
+
+    def first(self, line: str) -> int:
+        return self.words[self.forward.search(line).group()]
+
+    def last(self, line: str) -> int:
+        return self.words[self.backward.match(line).group(1)]
+
+    def calibration_value(self, line: str) -> int:
+        return 10*self.first(line) + self.last(line)
+
+
+_NOT_DIGIT_OR_NEWLINE = bytes(c for c in range(256) if not (ord("0") <= c <= ord("9") or c == ord("\n")))
+
+def calibration_sum(data: bytes) -> int:
+    r"""
+    Sum of the (first digit, last digit) calibration values of every line in `data`,
+    done over the raw bytes with numpy instead of looking at each character in python.
+    Lines without any digits contribute nothing.
+
+    >>> calibration_sum(b"1abc2\npqr3stu8vwx\n\na1b2c3d4e5f\ntreb7uchet")
+    142
+    """
+    # throw away everything that isn't a digit or a newline - then each line's digits
+    # are a single run, and its first and last digits are the ends of that run
+    kept = np.frombuffer(bytes(data).translate(None, _NOT_DIGIT_OR_NEWLINE), dtype=np.uint8)
+    is_digit = kept != ord("\n")
+    firsts = is_digit & np.r_[True, ~is_digit[:-1]]
+    lasts = is_digit & np.r_[~is_digit[1:], True]
+
+    # and since we only want the total, the tens and units can be summed separately
+    tens = kept[firsts].sum(dtype=np.int64) - ord("0")*np.count_nonzero(firsts)
+    units = kept[lasts].sum(dtype=np.int64) - ord("0")*np.count_nonzero(lasts)
+    return int(10*tens + units)
+
+def calibration_sum_file(path, chunk_size: int = 1 << 26) -> int:
+    r"""
+    Same as `calibration_sum`, but reads `path` `chunk_size` bytes at a time so the whole
+    document never has to be in memory. Any partial line at the end of a chunk is carried
+    over to the start of the next one.
+
+    >>> import tempfile
+    >>> with tempfile.NamedTemporaryFile() as f:
+    ...     _ = f.write(b"1abc2\npqr3stu8vwx\na1b2c3d4e5f\ntreb7uchet")
+    ...     f.flush()
+    ...     calibration_sum_file(f.name, chunk_size=4)
+    142
+    """
+    total = 0
+    leftover = b""
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            chunk = leftover + chunk
+            complete, _, leftover = chunk.rpartition(b"\n")
+            total += calibration_sum(complete)
+    return total + calibration_sum(leftover)
 
 def part_1(rawdata):
     r"""
@@ -9,12 +93,7 @@ def part_1(rawdata):
     ... treb7uchet''')
     142
     """
-    data = rawdata.splitlines()
-    def calib(line):
-        digits = [d for d in line if d.isdigit()]
-        return int(digits[0]+digits[-1])
-
-    return sum(calib(line) for line in data)
+    return calibration_sum(rawdata.encode())
 
 
 def part_2(rawdata):
@@ -29,23 +108,8 @@ def part_2(rawdata):
     ... 7pqrstsixteen''')
     281
     """
-    data = rawdata.splitlines()
-    def calib(line):
-        # we need to consider words instead of just numbers.. fine
-        # but they can overlap :( thats a bit evil for day 1...
-        real_line = line.replace("one", "one1one") \
-                   .replace("two", "two2two") \
-                   .replace("three", "three3three") \
-                   .replace("four",  "four4four") \
-                   .replace("five", "five5five") \
-                   .replace("six", "six6six") \
-                   .replace("seven", "seven7seven") \
-                   .replace("eight", "eight8eight") \
-                   .replace("nine", "nine9nine")
-        digits = [d for d in real_line if d.isdigit()]
-        return int(digits[0]+digits[-1])
-
-    return sum(calib(line) for line in data)
+    scanner = DigitScanner(DIGIT_WORDS)
+    return sum(scanner.calibration_value(line) for line in rawdata.splitlines())
 
 if __name__ == "__main__":
     import aocd
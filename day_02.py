@@ -1,33 +1,90 @@
 #!/usr/bin/env -S pdm run python
 
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass
-import parse
+from typing import NamedTuple
+import itertools as it
+import re
+import numpy as np
+
+class GameMaxima(NamedTuple):
+    id_: int
+    red: int
+    green: int
+    blue: int
+
+def stream_games(lines: Iterable[str]) -> Iterator[GameMaxima]:
+    """
+    Reads games one line at a time, keeping only the most cubes of each colour
+    seen in any draw - which is all either part needs to know about a game.
+
+    >>> list(stream_games(["Game 1: 3 blue, 4 red; 1 red, 2 green, 6 blue; 2 green", ""]))
+    [GameMaxima(id_=1, red=4, green=2, blue=6)]
+    """
+    for line in lines:
+        game, _, draws = line.partition(":")
+        if not draws:
+            continue
+
+        maxima = dict(red=0, green=0, blue=0)
+        for count, colour in re.findall(r"(\d+) (red|green|blue)", draws):
+            maxima[colour] = max(maxima[colour], int(count))
+        yield GameMaxima(int(game.removeprefix("Game ")), **maxima)
 
 @dataclass
-class CubeSubset:
+class GameStore:
     """
-    >>> CubeSubset("3 blue, 4 red")
-    CubeSubset(blue=3, red=4, green=0)
+    Every game's colour maxima as columns - the ids, and an N x 3 matrix of the most
+    (red, green, blue) cubes seen - so questions about lots of different bags can be
+    answered without parsing the games again.
+
+    >>> store = GameStore.from_games(stream_games([
+    ...     "Game 1: 3 blue, 4 red; 1 red, 2 green, 6 blue; 2 green",
+    ...     "Game 3: 8 green, 6 blue, 20 red; 5 blue, 4 red, 13 green; 5 green, 1 red"]))
+    >>> store.possible_id_sum((12, 13, 14))
+    1
+    >>> store.possible_id_sum([(12, 13, 14), (20, 13, 6), (3, 3, 3)])
+    array([1, 4, 0])
+    >>> store.power_sum()
+    1608
     """
-    blue: int = 0
-    red: int = 0
-    green: int = 0
+    ids: np.ndarray
+    maxima: np.ndarray
+
+    @classmethod
+    def from_games(cls, games: Iterable[GameMaxima]) -> "GameStore":
+        columns = np.fromiter(it.chain.from_iterable(games), dtype=np.int64).reshape(-1, 4)
+        return cls(columns[:, 0], columns[:, 1:])
 
-    def __init__(self, data:str):
-        @parse.with_pattern("|".join(self.__dataclass_fields__))
-        def parse_colour(text):
-            return text
+    @classmethod
+    def load(cls, path) -> "GameStore":
+        with np.load(path) as f:
+            return cls(f["ids"], f["maxima"])
 
-        for count, colour in parse.findall("{:n} {:colour}", data, extra_types={"colour":parse_colour}):
-            setattr(self, colour, count) 
+    def save(self, path):
+        np.savez(path, ids=self.ids, maxima=self.maxima)
 
-def parse_games(data: str) -> dict[int, list[CubeSubset]]:
-    def parse_game(line):
-        id_, subset_data = parse.parse("Game {:d}: {}", line)
-        return id_, [CubeSubset(subset) for subset in subset_data.split(";")]
+    def possible_id_sum(self, bags, chunk_size: int = 1 << 24):
+        """
+        Sum of the ids of the games that could have been played with `bags`, which is
+        either a single (red, green, blue) triple or a K x 3 array of them.
+        """
+        bags = np.asarray(bags, dtype=np.int64)
+        if bags.ndim == 1:
+            return int(self.possible_id_sum(bags[None, :])[0])
 
-    return dict(parse_game(line) for line in data.splitlines())
+        # K x N comparisons at once would be a lot of memory for big stores, so do
+        # as many bags at a time as fits in roughly chunk_size cells
+        per_chunk = max(1, chunk_size // max(1, len(self.ids)))
+        sums = np.empty(len(bags), dtype=np.int64)
+        for start in range(0, len(bags), per_chunk):
+            chunk = bags[start:start+per_chunk]
+            possible = (self.maxima[None, :, :] <= chunk[:, None, :]).all(axis=2)
+            sums[start:start+per_chunk] = possible @ self.ids
+        return sums
 
+    def power_sum(self) -> int:
+        return int(self.maxima.prod(axis=1).sum())
 
 def part_1(rawdata):
     r"""
@@ -39,12 +96,8 @@ def part_1(rawdata):
     ... Game 5: 6 red, 1 blue, 3 green; 2 blue, 1 red, 2 green''')
     8
     """
-    games = parse_games(rawdata)
-    
-    def is_possible(game):
-        return all(subset.red <= 12 and subset.green <= 13 and subset.blue <= 14 for subset in game)
-
-    return sum(id_ for id_,game in games.items() if is_possible(game))
+    games = stream_games(rawdata.splitlines())
+    return sum(game.id_ for game in games if game.red <= 12 and game.green <= 13 and game.blue <= 14)
 
 def part_2(rawdata):
     r"""
@@ -56,11 +109,8 @@ def part_2(rawdata):
     ... Game 5: 6 red, 1 blue, 3 green; 2 blue, 1 red, 2 green''')
     2286
     """
-    games = parse_games(rawdata)
-    def minimum_power(game):
-        return max(s.red for s in game) * max(s.green for s in game) * max(s.blue for s in game) 
-
-    return sum(minimum_power(game) for game in games.values())
+    games = stream_games(rawdata.splitlines())
+    return sum(game.red * game.green * game.blue for game in games)
 
 if __name__ == "__main__":
     import aocd
@@ -1,8 +1,294 @@
 #!/usr/bin/env -S pdm run python
-import parse
-import itertools as it
 from collections import defaultdict
+from collections.abc import Iterable, Iterator
+import itertools as it
 import math
+import re
+from typing import NamedTuple
+import numpy as np
+
+# the eight neighbours of a cell, plus the cell itself
+NEIGHBOURHOOD = [(dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1)]
+
+def load_schematic(rawdata: str) -> np.ndarray:
+    """
+    The schematic as a 2D array of bytes, with a border of "." all the way round so
+    that looking at a neighbour never falls off the edge.
+    """
+    data = rawdata.splitlines()
+    height, width = len(data), len(data[0])
+    grid = np.full((height+2, width+2), ord("."), dtype=np.uint8)
+    grid[1:-1, 1:-1] = np.frombuffer("".join(data).encode(), dtype=np.uint8).reshape(height, width)
+    return grid
+
+def schematic_sums(rawdata: str) -> tuple[int, int]:
+    r"""
+    The sum of the part numbers, and the sum of the gear ratios, in one go.
+
+    >>> schematic_sums('''\
+    ... 467..114..
+    ... ...*......
+    ... ..35..633.
+    ... ......#...
+    ... 617*......
+    ... .....+.58.
+    ... ..592.....
+    ... ......755.
+    ... ...$.*....
+    ... .664.598..
+    ... ''')
+    (4361, 467835)
+
+    Really long numbers don't overflow:
+
+    >>> schematic_sums('''\
+    ... 12345678901234567890*
+    ... ''')
+    (12345678901234567890, 0)
+    """
+    grid = load_schematic(rawdata)
+    width = grid.shape[1]
+    flat = grid.ravel()
+    # positions in the grid fit in int32 unless it's enormous, and only ever get
+    # looked up for the digits (and the gears), never for every cell
+    index = np.int32 if grid.size < 2**31 else np.int64
+
+    # numbers are runs of digits - the border means a run never wraps onto the next row
+    cells = np.flatnonzero((grid >= ord("0")) & (grid <= ord("9"))).astype(index)
+    if not len(cells):
+        return 0, 0
+    gap = np.diff(cells) != 1
+    run_starts, run_ends = np.r_[True, gap], np.r_[gap, True]
+    number_of_cell = np.cumsum(run_starts, dtype=index) - 1
+    starts = cells[run_starts]
+    lengths = cells[run_ends] - starts + 1
+
+    # int64 is fine for any sane schematic, but a long enough run of digits (or a lot of
+    # big ones added up) would quietly wrap round, so those get Python ints instead
+    gears = np.flatnonzero(grid == ord("*")).astype(index)
+    biggest = 10**int(lengths.max())
+    fits = (len(starts) + len(gears)) * biggest**2 < 2**63
+    dtype = np.int64 if fits else object
+
+    # a digit at a time along all the numbers at once
+    numbers = np.zeros(len(starts), dtype=dtype)
+    for place in range(int(lengths.max())):
+        going = lengths > place
+        numbers[going] = numbers[going]*10 + (flat[starts[going] + place] - ord("0")).astype(dtype)
+
+    # each neighbour of each digit, looked at one direction at a time. A number's a part
+    # number if any of its digits is next to a symbol, and each (gear, number) pair that
+    # touch gets counted once however many cells touch
+    near_symbol = np.zeros(len(cells), dtype=bool)
+    touching = []
+    for dy, dx in NEIGHBOURHOOD:
+        neighbours = cells + dy*width + dx
+        neighbour = flat[neighbours]
+        near_symbol |= (neighbour != ord(".")) & ((neighbour < ord("0")) | (neighbour > ord("9")))
+
+        is_gear = neighbour == ord("*")
+        gear = np.searchsorted(gears, neighbours[is_gear]).astype(np.int64)
+        touching.append(gear*len(numbers) + number_of_cell[is_gear])
+
+    is_part = np.logical_or.reduceat(near_symbol, np.flatnonzero(run_starts))
+    part_sum = int(numbers[is_part].sum())
+
+    gear, number = np.divmod(np.unique(np.concatenate(touching)), len(numbers))
+
+    # and the gears with exactly two numbers are next to each other in there
+    _, first, count = np.unique(gear, return_index=True, return_counts=True)
+    pairs = first[count == 2]
+    gear_ratio_sum = int((numbers[number[pairs]] * numbers[number[pairs+1]]).sum())
+
+    return part_sum, gear_ratio_sum
+
+NUMBER = re.compile(r"\d+")
+SYMBOL = re.compile(r"[^\d.]")
+GEAR = re.compile(r"\*")
+
+def stream_schematic(lines: Iterable[str]) -> Iterator[tuple[str, int]]:
+    r"""
+    Works through the schematic a row at a time, only ever holding the rows above and
+    below the one it's looking at. Yields ("part", number) for each part number as soon
+    as the row below it has been read, and ("gear", ratio) for each gear once nothing
+    else can touch it.
+
+    >>> list(stream_schematic(["467..114..\n", "...*......\n", "..35..633.\n"]))
+    [('part', 467), ('part', 35), ('gear', 16345)]
+    """
+    # numbers touching each gear we've seen so far, by row and then column -
+    # a gear is finished with once we've looked at all the numbers on the row below it
+    gears = defaultdict(lambda: defaultdict(list))
+
+    rows = (line.rstrip("\n") for line in lines)
+    above, here = "", next(rows, None)
+    if here is None:
+        return
+
+    for y, below in enumerate(it.chain(rows, [""])):
+        for match in NUMBER.finditer(here):
+            number = int(match.group())
+            start, end = max(0, match.start()-1), match.end()+1
+            neighbourhood = above[start:end], here[start:end], below[start:end]
+
+            if any(SYMBOL.search(row) for row in neighbourhood):
+                yield "part", number
+
+            for dy, row in zip((-1, 0, 1), neighbourhood):
+                for gear in GEAR.finditer(row):
+                    gears[y+dy][start+gear.start()].append(number)
+
+        yield from finished_gears(gears.pop(y-1, {}))
+        above, here = here, below
+
+    for row in gears.values():
+        yield from finished_gears(row)
+
+def finished_gears(row: dict[int, list[int]]) -> Iterator[tuple[str, int]]:
+    for numbers in row.values():
+        if len(numbers) == 2:
+            yield "gear", math.prod(numbers)
+
+def stream_schematic_sums(lines: Iterable[str]) -> tuple[int, int]:
+    r"""
+    Same as `schematic_sums`, but for a schematic that is read one line at a time.
+
+    >>> import io
+    >>> stream_schematic_sums(io.StringIO('''\
+    ... 467..114..
+    ... ...*......
+    ... ..35..633.
+    ... ......#...
+    ... 617*......
+    ... .....+.58.
+    ... ..592.....
+    ... ......755.
+    ... ...$.*....
+    ... .664.598..
+    ... '''))
+    (4361, 467835)
+    """
+    sums = dict(part=0, gear=0)
+    for kind, value in stream_schematic(lines):
+        sums[kind] += value
+    return sums["part"], sums["gear"]
+
+class Number(NamedTuple):
+    y: int
+    start: int
+    end: int
+    value: int
+
+def neighbours(x: int, y: int) -> Iterator[tuple[int, int]]:
+    for dy, dx in NEIGHBOURHOOD:
+        yield x+dx, y+dy
+
+class IncrementalSchematic:
+    r"""
+    Keeps both sums up to date as single cells of the schematic are changed, by only
+    looking again at the numbers and gears around the edit.
+
+    >>> schematic = IncrementalSchematic('''\
+    ... 467..114..
+    ... ...*......
+    ... ..35..633.
+    ... ......#...
+    ... 617*......
+    ... .....+.58.
+    ... ..592.....
+    ... ......755.
+    ... ...$.*....
+    ... .664.598..
+    ... ''')
+    >>> schematic.part_sum, schematic.gear_ratio_sum
+    (4361, 467835)
+    >>> schematic.set_cell(3, 1, ".")
+    >>> schematic.part_sum, schematic.gear_ratio_sum
+    (3859, 451490)
+    >>> schematic.set_cell(4, 0, "1")
+    >>> schematic.set_cell(9, 1, "*")
+    >>> (schematic.part_sum, schematic.gear_ratio_sum) == schematic_sums(str(schematic))
+    True
+    """
+    def __init__(self, rawdata: str):
+        self.grid = [list(line) for line in rawdata.splitlines()]
+        self.numbers: dict[int, Number] = {}
+        self.number_at: dict[tuple[int, int], int] = {}
+        self.ids = it.count()
+
+        for y, line in enumerate(rawdata.splitlines()):
+            for match in NUMBER.finditer(line):
+                self._add_number(y, match.start(), match.end())
+
+        self.part_sum = sum(number.value for number in self.numbers.values() if self._is_part(number))
+        self.gear_ratio_sum = sum(self._gear_ratio(x, y) for y, row in enumerate(self.grid)
+                                                         for x, c in enumerate(row) if c == "*")
+
+    def __getitem__(self, pos: tuple[int, int]) -> str:
+        x, y = pos
+        if 0 <= y < len(self.grid) and 0 <= x < len(self.grid[y]):
+            return self.grid[y][x]
+        return "."
+
+    def __str__(self):
+        return "\n".join("".join(row) for row in self.grid) + "\n"
+
+    def set_cell(self, x: int, y: int, c: str):
+        if not (0 <= y < len(self.grid) and 0 <= x < len(self.grid[y])):
+            raise IndexError(f"({x}, {y}) is outside the schematic")
+
+        # Any number that could change - either because it's being edited, or the
+        # cell is next to it - has a cell somewhere around the edit. The numbers
+        # after the edit are made up of the same cells, so any gear whose ratio
+        # could change is next to one of them
+        affected = {self.number_at[p] for p in neighbours(x, y) if p in self.number_at}
+        cells = {(x, y)} | {(cx, number.y) for number in map(self.numbers.get, affected)
+                                           for cx in range(number.start, number.end)}
+        nearby = {p for cell in cells for p in neighbours(*cell)}
+
+        # take out everything that might change..
+        self.part_sum -= sum(self.numbers[id_].value for id_ in affected if self._is_part(self.numbers[id_]))
+        self.gear_ratio_sum -= sum(self._gear_ratio(*p) for p in nearby if self[p] == "*")
+        for id_ in affected:
+            self._remove_number(id_)
+
+        self.grid[y][x] = c
+
+        # ..and put it back in
+        for cx, cy in cells:
+            if self[cx, cy].isdecimal() and (cx, cy) not in self.number_at:
+                start, end = cx, cx+1
+                while self[start-1, cy].isdecimal():
+                    start -= 1
+                while self[end, cy].isdecimal():
+                    end += 1
+                number = self._add_number(cy, start, end)
+                if self._is_part(number):
+                    self.part_sum += number.value
+        self.gear_ratio_sum += sum(self._gear_ratio(*p) for p in nearby if self[p] == "*")
+
+    def _add_number(self, y: int, start: int, end: int) -> Number:
+        id_ = next(self.ids)
+        number = self.numbers[id_] = Number(y, start, end, int("".join(self.grid[y][start:end])))
+        for x in range(start, end):
+            self.number_at[x, y] = id_
+        return number
+
+    def _remove_number(self, id_: int):
+        number = self.numbers.pop(id_)
+        for x in range(number.start, number.end):
+            del self.number_at[x, number.y]
+
+    def _is_part(self, number: Number) -> bool:
+        return any(not (c := self[x, y]).isdecimal() and c != "."
+                   for x in range(number.start-1, number.end+1)
+                   for y in (number.y-1, number.y, number.y+1))
+
+    def _gear_ratio(self, x: int, y: int) -> int:
+        touching = {self.number_at[p] for p in neighbours(x, y) if p in self.number_at}
+        if len(touching) != 2:
+            return 0
+        return math.prod(self.numbers[id_].value for id_ in touching)
 
 def part_1(rawdata):
     r"""
@@ -20,22 +306,7 @@ def part_1(rawdata):
     ... ''')
     4361
     """
-    data = rawdata.splitlines()
-    parts_found = []
-    width, height = len(data[0]), len(data)
-    for lineno, line in enumerate(data):
-        for res in parse.findall("{:d}", line):
-            number = abs(res.fixed[0])
-
-            start_col, end_col = res.spans[0]
-
-            for x,y in it.product(range(start_col-1,end_col+1),(lineno-1,lineno,lineno+1)):
-                if 0 <= x < width and 0 <= y < height:
-                    c = data[y][x]
-                    if not c.isdigit() and c != ".":
-                        parts_found.append(number)
-                        break
-    return sum(parts_found)
+    return schematic_sums(rawdata)[0]
 
 def part_2(rawdata):
     r"""
@@ -53,21 +324,7 @@ def part_2(rawdata):
     ... ''')
     467835
     """
-    data = rawdata.splitlines()
-    gears_found = defaultdict(list)
-
-    width, height = len(data[0]), len(data)
-    for lineno, line in enumerate(data):
-        for res in parse.findall("{:d}", line):
-            number = abs(res.fixed[0])
-            start_col, end_col = res.spans[0]
-
-            for x,y in it.product(range(start_col-1,end_col+1),(lineno-1,lineno,lineno+1)):
-                if 0 <= x < width and 0 <= y < height:
-                    if data[y][x] == "*":
-                        gears_found[(x,y)].append(number)
-                        
-    return sum(math.prod(parts) for parts in gears_found.values() if len(parts) == 2)
+    return schematic_sums(rawdata)[1]
 
 if __name__ == "__main__":
     import aocd
@@ -1,7 +1,9 @@
 #!/usr/bin/env -S pdm run python
 from dataclasses import dataclass
-from collections import Counter
+from collections.abc import Iterable
+from typing import NamedTuple
 import re
+import numpy as np
 
 @dataclass
 class Card:
@@ -16,9 +18,111 @@ class Card:
         self.winning_numbers = [int(n) for n in winning.split()]
         self.selected_numbers = [int(n) for n in selected.split()]
 
-        self.matches = sum(number in self.winning_numbers for number in self.selected_numbers)
+        winning = set(self.winning_numbers)
+        self.matches = sum(number in winning for number in self.selected_numbers)
 
 
+CARD_HEADER = re.compile(r"Card\s+(\d+)\s*:")
+
+# numbers below this get checked with a lookup table rather than by comparing them all
+LOOKUP_TABLE_SIZE = 128
+
+class CardTable(NamedTuple):
+    ids: np.ndarray
+    winning_numbers: np.ndarray
+    selected_numbers: np.ndarray
+
+def parse_cards(rawdata: str) -> CardTable:
+    r"""
+    All the cards at once, as a column of ids and a (cards x numbers) array each for
+    the winning and selected numbers. Every card has to have the same amount of numbers.
+
+    >>> parse_cards('''\
+    ... Card 1: 41 48 | 83 86  6
+    ... Card 2: 13 32 | 61 30 13
+    ... ''')
+    CardTable(ids=array([1, 2]), winning_numbers=array([[41, 48],
+           [13, 32]]), selected_numbers=array([[83, 86,  6],
+           [61, 30, 13]]))
+    """
+    first_card = CARD_HEADER.sub("", rawdata.partition("\n")[0])
+    winning, _, selected = first_card.partition("|")
+    n_winning, n_selected = len(winning.split()), len(selected.split())
+
+    # the only digits are the ids and the numbers, so every run of digits in the
+    # whole file is the next column along
+    numbers = parse_integers(rawdata.encode()).reshape(-1, 1+n_winning+n_selected)
+    return CardTable(numbers[:, 0], numbers[:, 1:1+n_winning], numbers[:, 1+n_winning:])
+
+def parse_integers(data: bytes) -> np.ndarray:
+    """
+    Every run of digits in `data`, as integers.
+
+    >>> parse_integers(b"Card  12: 3 45 | 678")
+    array([ 12,   3,  45, 678])
+
+    Anything too long for int64 comes back as Python ints rather than wrapping round:
+
+    >>> parse_integers(b"1 12345678901234567890")
+    array([1, 12345678901234567890], dtype=object)
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    is_digit = (buffer >= ord("0")) & (buffer <= ord("9"))
+    digits = np.flatnonzero(is_digit)
+    if not len(digits):
+        return np.empty(0, dtype=np.int64)
+
+    starts = np.flatnonzero(np.diff(digits) != 1) + 1
+    lengths = np.diff(np.r_[0, starts, len(digits)])
+    place = np.repeat(np.cumsum(lengths), lengths) - np.arange(len(digits)) - 1
+    dtype = np.int64 if lengths.max() <= 18 else object
+    values = (buffer[digits] - ord("0")).astype(dtype) * 10**place.astype(dtype)
+    return np.add.reduceat(values, np.r_[0, starts])
+
+def count_matches(cards: CardTable, chunk_size: int = 1 << 16) -> np.ndarray:
+    r"""
+    How many of each card's selected numbers are winning numbers, a chunk of cards at
+    a time. When the numbers are all small, each chunk gets a table of which numbers
+    are winners for each card, so checking a selected number is a single lookup.
+    Otherwise that table would be far too big, so every selected number gets compared
+    against every winning number on its card instead.
+
+    >>> count_matches(parse_cards('''\
+    ... Card 1: 41 48 | 83 48  6
+    ... Card 2: 13 32 | 32 30 13
+    ... '''))
+    array([1, 2])
+    >>> count_matches(parse_cards('''\
+    ... Card 1: 70000000 48 | 83 48 70000000
+    ... Card 2: 13 12345678901234567890 | 12345678901234567891 30 13
+    ... '''))
+    array([2, 1])
+    """
+    matches = np.empty(len(cards.ids), dtype=np.int64)
+    if not len(cards.ids):
+        return matches
+
+    largest = max(cards.winning_numbers.max(initial=0), cards.selected_numbers.max(initial=0))
+    if largest < LOOKUP_TABLE_SIZE:
+        for start in range(0, len(cards.ids), chunk_size):
+            winning = cards.winning_numbers[start:start+chunk_size]
+            selected = cards.selected_numbers[start:start+chunk_size]
+            rows = np.arange(len(winning))[:, None]
+
+            is_winner = np.zeros((len(winning), LOOKUP_TABLE_SIZE), dtype=bool)
+            is_winner[rows, winning] = True
+            matches[start:start+chunk_size] = is_winner[rows, selected].sum(axis=1)
+        return matches
+
+    # keep each chunk's (cards x selected x winning) comparison about as big as the table would be
+    n_compared = cards.winning_numbers.shape[1] * cards.selected_numbers.shape[1]
+    chunk_size = max(1, chunk_size * LOOKUP_TABLE_SIZE // max(1, n_compared))
+    for start in range(0, len(cards.ids), chunk_size):
+        winning = cards.winning_numbers[start:start+chunk_size]
+        selected = cards.selected_numbers[start:start+chunk_size]
+        matches[start:start+chunk_size] = (selected[:, :, None] == winning[:, None, :]).any(axis=2).sum(axis=1)
+    return matches
+
 def part_1(rawdata):
     r"""
     >>> part_1('''\
@@ -30,9 +134,52 @@ def part_1(rawdata):
     ... Card 6: 31 18 13 56 72 | 74 77 10 23 35 67 36 11
     ... ''')
     13
+
+    A card with loads of matches is worth more than int64 can hold:
+
+    >>> numbers = " ".join(map(str, range(1, 71)))
+    >>> part_1(f"Card 1: {numbers} | {numbers}\n") == 2**69
+    True
+    """
+    matches = count_matches(parse_cards(rawdata))
+    if not len(matches):
+        return 0
+
+    # each score is at most 2**(most-1), so if there are enough cards to add up to
+    # 2**63 it'd wrap round - then it has to be Python ints
+    most = int(matches.max())
+    if most >= 62 or len(matches) << max(most-1, 0) >= 2**63:
+        return sum(1 << (n-1) for n in matches.tolist() if n)
+    return int(((1 << matches) >> 1).sum())
+
+def total_cards(matches: Iterable[int], max_matches: int) -> int:
     """
-    cards = [Card(line) for line in rawdata.splitlines()]
-    return sum(2**(card.matches-1) for card in cards if card.matches)
+    How many cards we end up with, given how many matches each card has in order.
+    A card with n matches adds its copies to the next n cards - rather than doing
+    all those additions, we keep a difference array of where each run of extra copies
+    starts and stops. Only the next max_matches+1 cards can ever have one pending, so
+    it can be a ring buffer that size, and the cards can come from a stream.
+
+    >>> total_cards([4, 2, 2, 1, 0, 0], max_matches=4)
+    30
+    """
+    size = max_matches + 1
+    changes = [0]*size
+    copies = total = 0
+    for i, n in enumerate(matches):
+        if n > max_matches:
+            raise ValueError(f"Card {i+1} has {n} matches but max_matches is {max_matches}")
+
+        copies += changes[i % size]
+        changes[i % size] = 0
+
+        # this card, plus all the copies earlier cards won
+        count = copies + 1
+        total += count
+        changes[(i+1) % size] += count
+        changes[(i+n+1) % size] -= count
+
+    return total
 
 def part_2(rawdata):
     r"""
@@ -46,16 +193,8 @@ def part_2(rawdata):
     ... ''')
     30
     """
-    cards = [Card(line) for line in rawdata.splitlines()]
-    count = Counter(card.id_ for card in cards)
-    for i, card in enumerate(cards):
-        current_count = count[card.id_]
-        for j in range(1, card.matches+1):
-            if i+j < len(cards):
-                count[cards[i+j].id_] += current_count
-
-    return count.total()
-
+    cards = parse_cards(rawdata)
+    return total_cards(count_matches(cards).tolist(), max_matches=cards.selected_numbers.shape[1])
 
 if __name__ == "__main__":
     import aocd
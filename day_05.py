@@ -1,20 +1,130 @@
 #!/usr/bin/env -S pdm run python
 
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass
-from functools import singledispatchmethod
+from functools import reduce, singledispatchmethod
 from parse import parse
 
 import itertools as it
+import numpy as np
 import portion as P
 
 def interval_range(start:int, size:int) -> P.Interval:
     return P.closedopen(start, start+size)
 
+@dataclass
+class PiecewiseMap:
+    """
+    A map that adds offsets[i] to x, where i is how many of the (sorted)
+    breakpoints are <= x - so looking something up is one bisect and an add.
+
+    >>> m = PiecewiseMap([50, 98, 100], [0, 2, -48, 0])
+    >>> m[10], m[50], m[97], m[98], m[99], m[100]
+    (10, 52, 99, 50, 51, 100)
+    """
+    breakpoints: list[int]
+    offsets: list[int]
+
+    @classmethod
+    def from_rules(cls, rules: P.IntervalDict) -> "PiecewiseMap":
+        breakpoints, offsets = [], [0]
+        for lower, upper, offset in sorted((atomic.lower, atomic.upper, offset)
+                                           for interval, offset in rules.items() for atomic in interval):
+            # rules that touch the one before share its end as their start
+            if breakpoints and breakpoints[-1] == lower:
+                offsets[-1] = offset
+            else:
+                breakpoints.append(lower)
+                offsets.append(offset)
+            breakpoints.append(upper)
+            offsets.append(0)
+        return cls(breakpoints, offsets)
+
+    def __getitem__(self, source:int) -> int:
+        return source + self.offsets[bisect_right(self.breakpoints, source)]
+
+    def map_array(self, sources:np.ndarray) -> np.ndarray:
+        """
+        Looks up a whole array of sources at once.
+
+        >>> PiecewiseMap([50, 98, 100], [0, 2, -48, 0]).map_array(np.array([10, 50, 97, 98, 99, 100]))
+        array([ 10,  52,  99,  50,  51, 100])
+        """
+        sources = np.asarray(sources, dtype=np.int64)
+        offsets = np.array(self.offsets, dtype=np.int64)
+        return sources + offsets[np.searchsorted(np.array(self.breakpoints, dtype=np.int64), sources, side="right")]
+
+    def then(self, other:"PiecewiseMap") -> "PiecewiseMap":
+        """
+        The map that does this one, and then `other`.
+
+        >>> PiecewiseMap([10, 20], [0, 5, 0]).then(PiecewiseMap([18], [0, 100]))
+        PiecewiseMap(breakpoints=[10, 13, 20], offsets=[0, 5, 105, 100])
+        """
+        breakpoints, offsets = [], []
+        bounds = [None, *self.breakpoints, None]
+        for lower, upper, offset in zip(bounds, bounds[1:], self.offsets):
+            # this piece lands on [lower+offset, upper+offset) - so other's breakpoints
+            # in there split it up further
+            first = 0 if lower is None else bisect_right(other.breakpoints, lower + offset)
+            last = len(other.breakpoints) if upper is None else bisect_left(other.breakpoints, upper + offset)
+
+            if lower is not None:
+                breakpoints.append(lower)
+            offsets.append(offset + other.offsets[first])
+            for i in range(first, last):
+                breakpoints.append(other.breakpoints[i] - offset)
+                offsets.append(offset + other.offsets[i+1])
+
+        # and there's no need to keep breakpoints that don't change anything
+        merged = PiecewiseMap([], offsets[:1])
+        for breakpoint, offset in zip(breakpoints, offsets[1:]):
+            if offset != merged.offsets[-1]:
+                merged.breakpoints.append(breakpoint)
+                merged.offsets.append(offset)
+        return merged
+
+@dataclass
+class RangeMinimumIndex:
+    """
+    Answers "what's the smallest value anything in [start, stop) maps to" for a
+    PiecewiseMap. Each piece only ever adds a constant, so the smallest value in a
+    piece is from its lowest point - which is either `start` or one of the breakpoints.
+    The smallest of a run of breakpoints comes from a sparse table: table[k][i] is the
+    smallest of the 2**k pieces starting at breakpoint i, and any run is covered by two
+    of those. An empty range doesn't have a smallest value, so that's None.
+
+    >>> index = RangeMinimumIndex(PiecewiseMap([50, 98, 100], [0, 2, -48, 0]))
+    >>> index.min_over(45, 99), index.min_over(60, 99), index.min_over(60, 61), index.min_over(60, 60)
+    (45, 50, 62, None)
+    """
+    map: PiecewiseMap
+    table: list[list[int]]
+
+    def __init__(self, map:PiecewiseMap):
+        self.map = map
+        self.table = [[breakpoint + offset for breakpoint, offset in zip(map.breakpoints, map.offsets[1:])]]
+        while 2**len(self.table) <= len(map.breakpoints):
+            shorter, width = self.table[-1], 2**(len(self.table)-1)
+            self.table.append([min(a, b) for a, b in zip(shorter, shorter[width:])])
+
+    def min_over(self, start:int, stop:int) -> int|None:
+        if stop <= start:
+            return None
+
+        best = self.map[start]
+        first, last = bisect_right(self.map.breakpoints, start), bisect_left(self.map.breakpoints, stop)
+        if first < last:
+            k = (last - first).bit_length() - 1
+            best = min(best, self.table[k][first], self.table[k][last - 2**k])
+        return best
+
 @dataclass
 class ResourceMap:
     from_resource: str
     to_resource: str
     rules: P.IntervalDict[P.Interval,int]
+    lookup: PiecewiseMap
 
     def __init__(self, data:str):
         header, *rulesdata = data.splitlines()
@@ -22,34 +132,34 @@ class ResourceMap:
         self.rules = P.IntervalDict()
         for rule in rulesdata:
             dest_start, source_start, size = map(int, rule.split())
-            def mapper(source_start, dest_start):
-                def remap(x):
-                    return dest_start + x - source_start
-                return remap
-            self.rules[interval_range(source_start, size)] = mapper(source_start, dest_start)
+            self.rules[interval_range(source_start, size)] = dest_start - source_start
+        self.lookup = PiecewiseMap.from_rules(self.rules)
 
     @singledispatchmethod
     def __getitem__(self, source:int) -> int:
-        for source_range, remap in self.rules.items():
-            if source in source_range:
-                return remap(source)
-        return source
+        return self.lookup[source]
 
     @__getitem__.register
     def _(self, source:P.Interval) -> P.Interval:
         mapped, remainder = P.empty(), source
-        for source_interval, remap in self.rules[source].items():
+        for source_interval, offset in self.rules[source].items():
             for atomic in source_interval:
-                mapped |= P.closedopen(remap(atomic.lower), remap(atomic.upper))
+                mapped |= P.closedopen(atomic.lower + offset, atomic.upper + offset)
             remainder -= source_interval
         return mapped|remainder
 
 @dataclass
 class Almanac:
     maps: list[ResourceMap]
+    composed: PiecewiseMap
+    minimums: RangeMinimumIndex
 
     def __init__(self, data:list[str]):
         self.maps = [ResourceMap(d) for d in data]
+        # going through every map one after the other is the same as going
+        # through them all at once, which only needs working out once
+        self.composed = reduce(PiecewiseMap.then, (m.lookup for m in self.maps), PiecewiseMap([], [0]))
+        self.minimums = RangeMinimumIndex(self.composed)
 
     def __getitem__(self, seed:int|P.Interval):
         resource = seed
@@ -98,9 +208,9 @@ def part_1(rawdata):
     35
     """
     seeds_data, *rules_data = rawdata.split("\n\n")
-    seeds = [int(seed) for seed in seeds_data.removeprefix("seeds:").split()]
+    seeds = np.array(seeds_data.removeprefix("seeds:").split(), dtype=np.int64)
     almanac = Almanac(rules_data)
-    return min(almanac[seed] for seed in seeds)
+    return int(almanac.composed.map_array(seeds).min())
 
 
 def part_2(rawdata):
@@ -141,14 +251,32 @@ def part_2(rawdata):
     ... 56 93 4
     ... ''')
     46
+
+    A range with no seeds in doesn't count for anything:
+
+    >>> part_2('''\
+    ... seeds: 10 5 3 0
+    ... 
+    ... seed-to-location map:
+    ... 50 10 5
+    ... ''')
+    50
+
+    and if none of them have any seeds in, there's no lowest location at all:
+
+    >>> part_2('''\
+    ... seeds: 10 0 3 0
+    ... 
+    ... seed-to-location map:
+    ... 50 10 5
+    ... ''') is None
+    True
     """
     seeds_data, *rules_data = rawdata.split("\n\n")
-    seeds = P.empty()
-    for seed, size in it.batched(map(int, seeds_data.removeprefix("seeds:").split()), 2):
-        seeds |= interval_range(seed, size)
-
     almanac = Almanac(rules_data)
-    return almanac[seeds].lower
+    return min((almanac.minimums.min_over(seed, seed+size)
+                for seed, size in it.batched(map(int, seeds_data.removeprefix("seeds:").split()), 2)
+                if size > 0), default=None)
 
 if __name__ == "__main__":
     import aocd
@@ -1,7 +1,8 @@
 #!/usr/bin/env -S pdm run python
 
 from dataclasses import dataclass
-from math import sqrt, prod, floor, ceil
+from math import isqrt, prod
+import numpy as np
 
 @dataclass
 class BoatRace:
@@ -10,23 +11,65 @@ class BoatRace:
 
     @property
     def n_better_times(self):
+        """
+        >>> BoatRace(30, 200).n_better_times
+        9
+        >>> BoatRace(2**80 + 1, 2**158).n_better_times
+        1554944255988
+        """
         # The distance travelled when we hold the button for x units of time
         # is x(allowed_time - x). So we're looking for 
         #     x(allowed_time - x) > best_distance
         #     -x**2 - allowed_time*x - best_distance > 0
         # This is always an upside-down parabola, so it will be greater than 0
         # between the two roots, meaning the ways we can do better are the integers
-        # in that interval
+        # in that interval. It's symmetric around allowed_time/2, so if lo is the
+        # first time that does better, there are allowed_time - 2*lo + 1 of them
 
         t,d = self.allowed_time, self.best_distance
+        if t**2 - 4*d < 0:
+            return 0
 
-        lo, hi = (t - sqrt(t**2 - 4*d))/2, \
-                 (t + sqrt(t**2 - 4*d))/2 
+        # isqrt keeps this exact however big the numbers get - it can still be
+        # a little off from the real root, so nudge it onto the first one that wins
+        lo = (t - isqrt(t**2 - 4*d))//2
+        while lo*(t-lo) <= d and lo <= t//2:
+            lo += 1
+        while lo > 0 and (lo-1)*(t-lo+1) > d:
+            lo -= 1
 
-        lo_int = ceil(lo) if lo%1 else int(lo)+1
-        hi_int = floor(hi) if hi%1 else int(hi)-1
-        
-        return hi_int - lo_int + 1 
+        return max(0, t - 2*lo + 1)
+
+# t**2 and 4*d both have to fit in an int64 for the numpy version to be exact
+INT64_SAFE_TIME, INT64_SAFE_DISTANCE = 2**31, 2**60
+
+def n_better_times(times, distances) -> list[int]:
+    """
+    BoatRace.n_better_times for lots of races at once. When all of them are small
+    enough, they're done together with numpy - otherwise one at a time with exact
+    integers.
+
+    >>> n_better_times([7, 15, 30], [9, 40, 200])
+    [4, 8, 9]
+    >>> n_better_times([7, 2**80 + 1], [9, 2**158])
+    [4, 1554944255988]
+    """
+    times, distances = list(times), list(distances)
+    if not times:
+        return []
+    if max(times) >= INT64_SAFE_TIME or max(distances) >= INT64_SAFE_DISTANCE or min(times) < 0 or min(distances) < 0:
+        return [BoatRace(t, d).n_better_times for t, d in zip(times, distances)]
+
+    t, d = np.array(times, dtype=np.int64), np.array(distances, dtype=np.int64)
+    lo = ((t - np.sqrt(np.maximum(t*t - 4*d, 0)))//2).astype(np.int64)
+
+    # the float square root is only ever off by a little, so a couple of
+    # nudges either way puts everything on the first time that wins
+    for _ in range(2):
+        lo = np.where(lo*(t-lo) <= d, lo+1, lo)
+        lo = np.where((lo > 0) & ((lo-1)*(t-lo+1) > d), lo-1, lo)
+
+    return np.maximum(0, t - 2*lo + 1).tolist()
 
 def part_1(rawdata):
     r"""
@@ -39,8 +82,7 @@ def part_1(rawdata):
     times_data, distances_data = rawdata.splitlines()
     times = map(int, times_data.removeprefix("Time:").split())
     distances = map(int, distances_data.removeprefix("Distance:").split())
-    races = [BoatRace(time,distance) for time,distance in zip(times,distances)]
-    return prod(r.n_better_times for r in races)
+    return prod(n_better_times(times, distances))
 
 
 def part_2(rawdata):
@@ -2,8 +2,14 @@
 
 from enum import Enum
 from dataclasses import dataclass
-from collections import Counter
-import parse
+from pathlib import Path
+import contextlib
+import functools
+import itertools as it
+import os
+import re
+import tempfile
+import numpy as np
 
 @dataclass
 class Card:
@@ -38,6 +44,211 @@ class HandType(Enum):
     def __lt__(self, other:"HandType"):
         return self.value < other.value
 
+# rank of each card face - with the joker rules, J is worth 1 instead
+CARD_RANKS = np.zeros(256, dtype=np.int64)
+CARD_RANKS[list(b"23456789TJQKA")] = range(2, 15)
+JOKER_RANK = 1
+
+# Adding up how many of each card there are, squared, gives a different total
+# for every hand type - eg a full house is 3**2 + 2**2 = 13
+HAND_TYPE_BY_SQUARES = np.zeros(26, dtype=np.int64)
+for counts, hand_type in [((1,1,1,1,1), HandType.HIGH_CARD), ((2,1,1,1), HandType.PAIR),
+                          ((2,2,1), HandType.TWO_PAIR), ((3,1,1), HandType.THREE_OF_A_KIND),
+                          ((3,2), HandType.FULL_HOUSE), ((4,1), HandType.FOUR_OF_A_KIND),
+                          ((5,), HandType.FIVE_OF_A_KIND)]:
+    HAND_TYPE_BY_SQUARES[sum(c**2 for c in counts)] = hand_type.value
+
+def parse_plays(rawdata: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    The hands as an (n x 5) array of card faces (as bytes), and their bids.
+    """
+    plays = re.findall(r"([2-9TJQKA]{5}) (\d+)", rawdata)
+    hands = np.frombuffer("".join(hand for hand, _ in plays).encode(), dtype=np.uint8).reshape(-1, 5)
+    bids = np.array([bid for _, bid in plays], dtype=np.int64)
+    return hands, bids
+
+def classify_hands(ranks: np.ndarray) -> np.ndarray:
+    """
+    The HandType value of each row of card ranks, where any jokers have rank 1.
+    """
+    is_joker = ranks == JOKER_RANK
+
+    # how many of the same card there are for each card in the hand - summed up, that
+    # counts each n-of-a-kind n times over, so gives the sum of the squares
+    same = (ranks[:, :, None] == ranks[:, None, :]) & ~is_joker[:, :, None]
+    counts = np.where(is_joker, 0, same.sum(axis=2))
+    squares = counts.sum(axis=1)
+
+    # jokers count as whatever we have most of already
+    most = counts.max(axis=1)
+    squares += (most + is_joker.sum(axis=1))**2 - most**2
+    return HAND_TYPE_BY_SQUARES[squares]
+
+# There are only 13**5 possible hands, so the type of every one of them (without
+# and then with jokers) is worked out once and kept in a file next to this one.
+# Each hand's place in there is its cards read as a base 13 number
+FACES = b"23456789TJQKA"
+HAND_TYPES_PATH = Path(__file__).with_name("day_07_hand_types.npy")
+
+def build_hand_types(index: np.ndarray|None = None) -> np.ndarray:
+    """
+    The table of hand types, or just the columns for the hands at `index`.
+    """
+    if index is None:
+        index = np.arange(len(FACES)**5)
+    digits = index[:, None] // len(FACES)**np.arange(4, -1, -1) % len(FACES)
+    ranks = CARD_RANKS[np.frombuffer(FACES, dtype=np.uint8)[digits]]
+    with_jokers = np.where(ranks == CARD_RANKS[ord("J")], JOKER_RANK, ranks)
+    return np.stack([classify_hands(ranks), classify_hands(with_jokers)]).astype(np.uint8)
+
+def is_current(table: np.ndarray) -> bool:
+    """
+    Whether a saved table still agrees with classify_hands, going by a spread of
+    hands - enough to catch it being left over from before classify_hands changed.
+    """
+    sample = np.arange(0, len(FACES)**5, 997)
+    return table.shape == (2, len(FACES)**5) and np.array_equal(table[:, sample], build_hand_types(sample))
+
+def load_hand_types() -> np.ndarray:
+    try:
+        table = np.load(HAND_TYPES_PATH, mmap_mode="r")
+        if is_current(table):
+            return table
+    except (OSError, ValueError):
+        pass
+
+    # written somewhere else first and then moved into place in one go, so anything
+    # else loading it at the same time never sees half a file
+    table = build_hand_types()
+    try:
+        f = tempfile.NamedTemporaryFile(dir=HAND_TYPES_PATH.parent, suffix=".npy", delete=False)
+    except OSError:
+        return table
+    try:
+        with f:
+            np.save(f, table)
+        # temporary files are only readable by whoever made them, but everyone
+        # importing this wants to be able to use the table
+        os.chmod(f.name, 0o644)
+        os.replace(f.name, HAND_TYPES_PATH)
+    except OSError:
+        with contextlib.suppress(OSError):
+            os.remove(f.name)
+        return table
+    return np.load(HAND_TYPES_PATH, mmap_mode="r")
+
+HAND_TYPES = load_hand_types()
+BASE_13 = str.maketrans(FACES.decode(), "0123456789abc")
+
+def hand_index(hands: np.ndarray) -> np.ndarray:
+    index = np.zeros(len(hands), dtype=np.int64)
+    for i in range(5):
+        index = index*len(FACES) + CARD_RANKS[hands[:, i]] - 2
+    return index
+
+def hand_keys(hands: np.ndarray, jokers: bool = False) -> np.ndarray:
+    """
+    Packs each hand into one integer that sorts the same way the hands do - the hand
+    type, and then each card's rank in 4 bits.
+
+    >>> hex(hand_keys(np.frombuffer(b"KTJJT", dtype=np.uint8).reshape(1, 5))[0])
+    '0x3dabba'
+    >>> hex(hand_keys(np.frombuffer(b"KTJJT", dtype=np.uint8).reshape(1, 5), jokers=True)[0])
+    '0x6da11a'
+    """
+    ranks = CARD_RANKS[hands]
+    if jokers:
+        ranks = np.where(ranks == CARD_RANKS[ord("J")], JOKER_RANK, ranks)
+
+    key = HAND_TYPES[int(jokers), hand_index(hands)].astype(np.int64)
+    for i in range(5):
+        key = key << 4 | ranks[:, i]
+    return key
+
+def total_winnings(keys: np.ndarray, bids: np.ndarray) -> int:
+    order = np.lexsort((bids, keys))
+    return int((bids[order] * np.arange(1, len(order)+1)).sum())
+
+@functools.cache
+def hand_positions(jokers: bool = False) -> np.ndarray:
+    """
+    Where each possible hand (by its place in HAND_TYPES) comes if all 13**5 of
+    them were sorted from weakest to strongest.
+    """
+    every_hand = np.array(list(it.product(FACES, repeat=5)), dtype=np.uint8)
+    positions = np.empty(len(every_hand), dtype=np.int64)
+    positions[np.argsort(hand_keys(every_hand, jokers))] = np.arange(len(every_hand))
+    return positions
+
+class RunningWinnings:
+    r"""
+    Keeps the total winnings up to date as hands come and go. Each hand has a fixed
+    place among every possible hand, so two Fenwick trees over those places - how many
+    hands we have, and the sum of their bids - tell us in O(log n) how many hands a new
+    one beats (which is its rank) and how much the ones it's beneath bid (since they
+    all go up a rank).
+
+    >>> winnings = RunningWinnings()
+    >>> for hand, bid in [("32T3K", 765), ("T55J5", 684), ("KK677", 28), ("KTJJT", 220), ("QQQJA", 483)]:
+    ...     winnings.insert(hand, bid)
+    >>> winnings.total
+    6440
+    >>> winnings.remove("KK677")
+    >>> winnings.total
+    5189
+    """
+    def __init__(self, jokers: bool = False):
+        self.positions = hand_positions(jokers)
+        self.counts = [0]*(len(self.positions)+1)
+        self.bid_sums = [0]*(len(self.positions)+1)
+        self.bids: dict[str, int] = {}
+        self.total = 0
+
+    def insert(self, hand: str, bid: int):
+        if hand in self.bids:
+            raise ValueError(f"{hand} has already been played")
+        position = self._position(hand)
+
+        below = self._prefix(self.counts, position)
+        above = self._prefix(self.bid_sums, len(self.positions)) - self._prefix(self.bid_sums, position+1)
+        self.total += bid*(below+1) + above
+
+        self._add(self.counts, position, 1)
+        self._add(self.bid_sums, position, bid)
+        self.bids[hand] = bid
+
+    def remove(self, hand: str):
+        bid = self.bids.pop(hand)
+        position = self._position(hand)
+
+        self._add(self.counts, position, -1)
+        self._add(self.bid_sums, position, -bid)
+
+        below = self._prefix(self.counts, position)
+        above = self._prefix(self.bid_sums, len(self.positions)) - self._prefix(self.bid_sums, position+1)
+        self.total -= bid*(below+1) + above
+
+    def _position(self, hand: str) -> int:
+        if len(hand) != 5:
+            raise ValueError(f"{hand} is not a hand of five cards")
+        return int(self.positions[int(hand.translate(BASE_13), 13)])
+
+    @staticmethod
+    def _add(tree: list[int], position: int, delta: int):
+        i = position + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    @staticmethod
+    def _prefix(tree: list[int], position: int) -> int:
+        # the total of everything before position
+        total, i = 0, position
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
 @dataclass(order=True)
 class Hand:
     hand_type: HandType
@@ -46,33 +257,8 @@ class Hand:
     def __init__(self, cards:list[Card]):
         self.cards = cards
 
-        # if all the cards are jokers.. thats just five jokers,
-        # so we skip all the shenanigans
-        if cards == [joker,joker,joker,joker,joker]:
-            self.hand_type = HandType.FIVE_OF_A_KIND
-            return
-
-        # otherwise we find the other card we have the most of (breaking ties with the card value)
-        # and treat the jokers as that for the purpose of figuring out the hand type
-        count = Counter(card for card in cards if card != joker)
-        n_jokers = 5 - count.total()
-        count[max(count, key=count.get)] += n_jokers
-
-        match count.most_common():
-            case [(_, 1),(_, 1),(_, 1),(_, 1),(_, 1)]:
-                self.hand_type = HandType.HIGH_CARD
-            case [(_,2),(_, 1),(_, 1),(_, 1)]:
-                self.hand_type = HandType.PAIR
-            case [(_,2), (_,2), (_,1)]:
-                self.hand_type = HandType.TWO_PAIR
-            case [(_,3),(_, 1),(_, 1)]:
-                self.hand_type = HandType.THREE_OF_A_KIND
-            case [(_,3),(_,2)]:
-                self.hand_type = HandType.FULL_HOUSE
-            case [(_,4),(_,1)]:
-                self.hand_type = HandType.FOUR_OF_A_KIND
-            case [(_,5)]:
-                self.hand_type = HandType.FIVE_OF_A_KIND
+        index = int("".join(card.value for card in cards).translate(BASE_13), 13)
+        self.hand_type = HandType(int(HAND_TYPES[int(joker in cards), index]))
 
 def part_1(rawdata):
     r"""
@@ -85,12 +271,8 @@ def part_1(rawdata):
     ... ''')
     6440
     """
-    @parse.with_pattern(r"[2-9TJKQA]{5}")
-    def parse_hand(data:str):
-        return Hand([Card(c) for c in data])
-
-    plays = sorted(tuple(play) for play in parse.findall("{:hand} {:d}", rawdata, extra_types={"hand":parse_hand}))
-    return sum(i*bet for i,(_,bet) in enumerate(plays, start=1))
+    hands, bids = parse_plays(rawdata)
+    return total_winnings(hand_keys(hands), bids)
 
 def part_2(rawdata):
     r"""
@@ -103,12 +285,8 @@ def part_2(rawdata):
     ... ''')
     5905
     """
-    @parse.with_pattern(r"[2-9TJKQA]{5}")
-    def parse_hand(data:str):
-        return Hand([Card(c) if c != "J" else joker for c in data])
-
-    plays = sorted(tuple(play) for play in parse.findall("{:hand} {:d}", rawdata, extra_types={"hand":parse_hand}))
-    return sum(i*bet for i,(_,bet) in enumerate(plays, start=1))
+    hands, bids = parse_plays(rawdata)
+    return total_winnings(hand_keys(hands, jokers=True), bids)
 
 if __name__ == "__main__":
     import aocd
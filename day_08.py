@@ -1,16 +1,277 @@
 #!/usr/bin/env -S pdm run python
 from __future__ import annotations
 
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from types import SimpleNamespace
+import itertools as it
 import math
+import os
 import re
-import itertools as it
+import numpy as np
+
+NODE = re.compile(r"(\w{3}) = \((\w{3}), (\w{3})\)")
+
+@dataclass
+class Network:
+    nodes: list[str]
+    left: np.ndarray
+    right: np.ndarray
+    go_right: np.ndarray
+
+    def __init__(self, rawdata: str):
+        instructions, graphdata = rawdata.split("\n\n")
+        found = NODE.findall(graphdata)
+        self.nodes = [node for node, _, _ in found]
+        ids = {node: i for i, node in enumerate(self.nodes)}
+        self.left = np.array([ids[left] for _, left, _ in found], dtype=np.intp)
+        self.right = np.array([ids[right] for _, _, right in found], dtype=np.intp)
+        self.go_right = np.array([c == "R" for c in instructions.strip()], dtype=bool)
+
+    def ids(self, predicate) -> np.ndarray:
+        return np.array([i for i, node in enumerate(self.nodes) if predicate(node)], dtype=np.intp)
+
+class JumpTable:
+    r"""
+    Where every node ends up after going through all of the instructions once (a
+    "trip"), and then after 2, 4, 8.. trips, along with whether an end node gets
+    hit along the way. That lets us skip over trips that don't hit an end node in
+    big jumps, and only step through the one trip that does.
+
+    >>> network = Network('''\
+    ... LLR
+    ... 
+    ... AAA = (BBB, BBB)
+    ... BBB = (AAA, ZZZ)
+    ... ZZZ = (ZZZ, ZZZ)
+    ... ''')
+    >>> JumpTable(network, network.ids(lambda node: node == "ZZZ")).first_hits(network.ids(lambda node: node != "ZZZ"))
+    array([6, 3])
+    """
+    def __init__(self, network: Network, ends: np.ndarray):
+        self.network = network
+        self.is_end = is_end = np.zeros(len(network.nodes), dtype=bool)
+        is_end[ends] = True
+
+        # walk every node through one trip at the same time, noting the
+        # first step (if any) where each of them is on an end node
+        here = np.arange(len(network.nodes))
+        first_hit = np.zeros(len(network.nodes), dtype=np.int64)
+        for step, right in enumerate(network.go_right, start=1):
+            here = (network.right if right else network.left)[here]
+            first_hit[(first_hit == 0) & is_end[here]] = step
+
+        self.trip_length = len(network.go_right)
+        self.first_hit = first_hit
+
+        # After as many trips as there are nodes, we must be going round in circles -
+        # so if we haven't hit an end by then, we never will, and there's no point
+        # jumping any further than that
+        self.jumps, self.hits = [here], [first_hit > 0]
+        for _ in range(len(network.nodes).bit_length()):
+            jump, hit = self.jumps[-1], self.hits[-1]
+            self.jumps.append(jump[jump])
+            self.hits.append(hit | hit[jump])
+
+    def first_hits(self, starts: np.ndarray) -> np.ndarray:
+        """
+        How many steps it takes to first land on an end node from each of `starts`,
+        or -1 if that never happens.
+        """
+        here = np.asarray(starts, dtype=np.intp)
+        trips = np.zeros(len(here), dtype=np.int64)
+        for k in reversed(range(len(self.jumps))):
+            skip = ~self.hits[k][here]
+            trips += skip.astype(np.int64) << k
+            here = np.where(skip, self.jumps[k][here], here)
+
+        hit = self.first_hit[here]
+        return np.where(hit > 0, trips*self.trip_length + hit, -1)
 
-def walk(graph, instructions, start, possible_ends):
+@dataclass
+class GhostCycle:
+    """
+    Every time a ghost is on an end node: some hits before it starts going round
+    in circles (early_hits, all at or before pre_period), and then the times of the
+    hits in the first time round (offsets), which repeat every `period` steps.
+    """
+    pre_period: int
+    period: int
+    early_hits: list[int]
+    offsets: list[int]
+
+    def __contains__(self, time: int) -> bool:
+        if time <= self.pre_period:
+            return time in self.early_hits
+        return any((time - offset) % self.period == 0 for offset in self.offsets)
+
+def analyse_ghost(table: JumpTable, start: int) -> GhostCycle:
+    r"""
+    A ghost is back where it was - same node, and same place in the instructions -
+    as soon as it starts a trip on a node it has started a trip on before. So that
+    only needs following one trip at a time until it happens.
+
+    >>> network = Network('''\
+    ... LR
+    ... 
+    ... 11A = (11B, XXX)
+    ... 11B = (XXX, 11Z)
+    ... 11Z = (11B, XXX)
+    ... XXX = (XXX, XXX)
+    ... ''')
+    >>> analyse_ghost(JumpTable(network, network.ids(lambda node: node.endswith("Z"))), 0)
+    GhostCycle(pre_period=2, period=2, early_hits=[2], offsets=[4])
+    """
+    seen, trip_starts = {}, []
     node = start
-    for step, instruction in enumerate(it.cycle(instructions), start=1):
-        node = graph[node][instruction == "R"]
-        if node in possible_ends:
-            return step
+    while node not in seen:
+        seen[node] = len(trip_starts)
+        trip_starts.append(node)
+        node = int(table.jumps[0][node])
+    first_repeat, trip_length = seen[node], table.trip_length
+
+    # and then every end node hit along the way, going through all the trips together
+    here = np.array(trip_starts, dtype=np.intp)
+    times = []
+    for step, right in enumerate(table.network.go_right, start=1):
+        here = (table.network.right if right else table.network.left)[here]
+        times.append(np.flatnonzero(table.is_end[here])*trip_length + step)
+    times = np.sort(np.concatenate(times)).tolist()
+
+    pre_period = first_repeat*trip_length
+    return GhostCycle(pre_period, (len(trip_starts) - first_repeat)*trip_length,
+                      [time for time in times if time <= pre_period],
+                      [time for time in times if time > pre_period])
+
+# Each worker process looks at the same arrays the parent compiled, through shared
+# memory - these are the worker's views of them (and the blocks they're in, which
+# have to stay open for as long as the views are used)
+_shared_blocks, _shared_table = [], None
+
+def _attach_table(layout: dict[str, tuple[str, tuple[int, ...], str]], trip_length: int):
+    global _shared_table
+    arrays = {}
+    for name, (block_name, shape, dtype) in layout.items():
+        block = SharedMemory(name=block_name)
+        _shared_blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+    # analyse_ghost only needs these bits of a JumpTable
+    _shared_table = SimpleNamespace(
+        network=SimpleNamespace(left=arrays["left"], right=arrays["right"], go_right=arrays["go_right"]),
+        jumps=[arrays["after_trip"]], is_end=arrays["is_end"], trip_length=trip_length)
+
+def _analyse_chunk(starts: list[int]) -> list[GhostCycle]:
+    return [analyse_ghost(_shared_table, start) for start in starts]
+
+def analyse_ghosts(table: JumpTable, starts: np.ndarray, processes: int | None = None) -> list[GhostCycle]:
+    r"""
+    analyse_ghost for every one of `starts`, split up between `processes` worker
+    processes (as many as there are CPUs if it's None). The workers all share one
+    copy of the compiled network rather than each getting their own.
+
+    >>> network = Network('''\
+    ... LR
+    ... 
+    ... 11A = (11B, XXX)
+    ... 11B = (XXX, 11Z)
+    ... 11Z = (11B, XXX)
+    ... 22A = (22B, XXX)
+    ... 22B = (22C, 22C)
+    ... 22C = (22Z, 22Z)
+    ... 22Z = (22B, 22B)
+    ... XXX = (XXX, XXX)
+    ... ''')
+    >>> table = JumpTable(network, network.ids(lambda node: node.endswith("Z")))
+    >>> starts = network.ids(lambda node: node.endswith("A"))
+    >>> analyse_ghosts(table, starts, processes=2) == [analyse_ghost(table, start) for start in starts]
+    True
+    """
+    processes = processes or os.cpu_count()
+    starts = [int(start) for start in starts]
+    if processes == 1 or len(starts) <= 1:
+        return [analyse_ghost(table, start) for start in starts]
+
+    arrays = dict(left=table.network.left, right=table.network.right, go_right=table.network.go_right,
+                  after_trip=table.jumps[0], is_end=table.is_end)
+    blocks, layout = [], {}
+    try:
+        for name, array in arrays.items():
+            block = SharedMemory(create=True, size=max(1, array.nbytes))
+            blocks.append(block)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            layout[name] = block.name, array.shape, array.dtype.str
+
+        # a few chunks per worker, so one slow chunk doesn't hold everything up
+        chunk_size = -(-len(starts) // (processes*4))
+        chunks = [starts[i:i+chunk_size] for i in range(0, len(starts), chunk_size)]
+        with ProcessPoolExecutor(processes, initializer=_attach_table, initargs=(layout, table.trip_length)) as pool:
+            return list(it.chain.from_iterable(pool.map(_analyse_chunk, chunks)))
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+def crt(a: int, m: int, b: int, n: int) -> tuple[int, int] | None:
+    """
+    The x (mod lcm(m, n)) with x = a (mod m) and x = b (mod n), if there is one.
+
+    >>> crt(2, 4, 3, 6)
+    >>> crt(2, 4, 4, 6)
+    (10, 12)
+    """
+    g = math.gcd(m, n)
+    if (b - a) % g:
+        return None
+    lcm = m // g * n
+    k = (b - a) // g * pow(m // g, -1, n // g) % (n // g)
+    return (a + m*k) % lcm, lcm
+
+def first_simultaneous_hit(ghosts: list[GhostCycle]) -> int | None:
+    """
+    The first time every ghost is on an end node at once, or None if that never happens.
+    With no ghosts at all, they're all already there before they've moved, so that's 0.
+    That isn't just the lcm of when each ghost first gets to an end - here the first
+    ghost is on one at 3, 4, 7, 8, 11, 12... and the second at 2, 4, 6, 8...
+
+    >>> first_simultaneous_hit([GhostCycle(pre_period=2, period=4, early_hits=[], offsets=[3, 4]),
+    ...                         GhostCycle(pre_period=2, period=2, early_hits=[2], offsets=[4])])
+    4
+    >>> first_simultaneous_hit([GhostCycle(pre_period=3, period=5, early_hits=[1], offsets=[4, 7]),
+    ...                         GhostCycle(pre_period=0, period=6, early_hits=[], offsets=[5])])
+    17
+    >>> first_simultaneous_hit([GhostCycle(pre_period=0, period=2, early_hits=[], offsets=[1]),
+    ...                         GhostCycle(pre_period=0, period=2, early_hits=[], offsets=[2])])
+    >>> first_simultaneous_hit([])
+    0
+    """
+    if not ghosts:
+        return 0
+
+    # Until every ghost is going round in circles, just try each of the
+    # first ghost's hits in turn
+    settled = max(ghost.pre_period for ghost in ghosts)
+    first = ghosts[0]
+    candidates = first.early_hits + [offset + k*first.period for offset in first.offsets
+                                                              for k in range(max(0, (settled - offset)//first.period + 1))]
+    for time in sorted(time for time in candidates if time <= settled):
+        if all(time in ghost for ghost in ghosts):
+            return time
+
+    # after that, they're all periodic, so the times that work for all of them
+    # are the solutions of some congruences
+    residues, modulus = {offset % first.period for offset in first.offsets}, first.period
+    for ghost in ghosts[1:]:
+        combined = set()
+        for residue, offset in it.product(residues, ghost.offsets):
+            if solution := crt(residue, modulus, offset % ghost.period, ghost.period):
+                combined.add(solution[0])
+        residues, modulus = combined, math.lcm(modulus, ghost.period)
+
+    if not residues:
+        return None
+    return min(settled + 1 + (residue - settled - 1) % modulus for residue in residues)
 
 def part_1(rawdata):
     r"""
@@ -35,11 +296,11 @@ def part_1(rawdata):
     ... ''')
     6
     """
-    instructions, graphdata = rawdata.split("\n\n")
-    graph = {node: (left, right) for node, left, right in re.findall(r"([A-Z]{3}) = \(([A-Z]{3}), ([A-Z]{3})\)", graphdata)}
-    return walk(graph, instructions, "AAA", ["ZZZ"])
+    network = Network(rawdata)
+    table = JumpTable(network, network.ids(lambda node: node == "ZZZ"))
+    return int(table.first_hits(network.ids(lambda node: node == "AAA"))[0])
 
-def part_2(rawdata):
+def part_2(rawdata, processes=1):
     r"""
     >>> part_2('''\
     ... LR
@@ -54,14 +315,40 @@ def part_2(rawdata):
     ... XXX = (XXX, XXX)
     ... ''')
     6
-    """
-    instructions, graphdata = rawdata.split("\n\n")
-    graph = {node: (left, right) for node, left, right in re.findall(r"(\w{3}) = \((\w{3}), (\w{3})\)", graphdata)}
 
-    startnodes = [node for node in graph if node.endswith("A")]
-    endnodes = [node for node in graph if node.endswith("Z")]
-    times = [walk(graph, instructions, start, endnodes) for start in startnodes]
-    return math.lcm(*times)
+    The first ghost only gets to 11Z after 3 and 4 steps, and then every 4 steps after
+    those - and the second ghost is on 22Z every 2 steps, so they meet after 4, not 6:
+
+    >>> part_2('''\
+    ... LR
+    ... 
+    ... 11A = (11B, 11B)
+    ... 11B = (11B, 11C)
+    ... 11C = (11Z, 11Z)
+    ... 11Z = (11B, 11Z)
+    ... 22A = (22B, 22Z)
+    ... 22B = (22Z, 22Z)
+    ... 22Z = (22B, 22Z)
+    ... ''')
+    4
+
+    And if they're never all on an end node at once, there's no answer:
+
+    >>> part_2('''\
+    ... L
+    ... 
+    ... 11A = (11Z, 11Z)
+    ... 11Z = (11B, 11B)
+    ... 11B = (11Z, 11Z)
+    ... 22A = (22B, 22B)
+    ... 22B = (22Z, 22Z)
+    ... 22Z = (22B, 22B)
+    ... ''') is None
+    True
+    """
+    network = Network(rawdata)
+    table = JumpTable(network, network.ids(lambda node: node.endswith("Z")))
+    return first_simultaneous_hit(analyse_ghosts(table, network.ids(lambda node: node.endswith("A")), processes))
 
 if __name__ == "__main__":
     import aocd
@@ -1,6 +1,72 @@
 #!/usr/bin/env -S pdm run python
-import itertools as it
-from functools import reduce
+from collections import defaultdict
+from collections.abc import Iterable
+import functools
+import math
+import numpy as np
+
+@functools.cache
+def extrapolation_weights(length: int) -> tuple[list[int], list[int]]:
+    """
+    Building the table of differences and adding the ends back up is the same as
+    taking n-th differences until they're constant - and the n-th difference is a
+    fixed combination of the values, with alternating binomial coefficients. So the
+    values either side of a sequence of `length` values are weighted sums of it,
+    with these weights (for before, and after).
+
+    >>> extrapolation_weights(3)
+    ([3, -3, 1], [1, -3, 3])
+    """
+    after = [(-1)**(length-1-i) * math.comb(length, i) for i in range(length)]
+    before = [(-1)**i * math.comb(length, i+1) for i in range(length)]
+    return before, after
+
+def extrapolate(vals: list[int]) -> tuple[int, int]:
+    """
+    >>> extrapolate([10, 13, 16, 21, 30, 45])
+    (5, 68)
+    """
+    before, after = extrapolation_weights(len(vals))
+    return sum(w*v for w, v in zip(before, vals)), sum(w*v for w, v in zip(after, vals))
+
+def extrapolation_sums(lines: Iterable[str], chunk_size: int = 1 << 16) -> tuple[int, int]:
+    """
+    The total of the values before, and after, every sequence in `lines`. Sequences
+    of the same length are gathered up into blocks of up to `chunk_size` and done
+    together with numpy - since extrapolating is just a weighted sum, the total for
+    a whole block is the weights times the block's column totals.
+
+    >>> extrapolation_sums(["0 3 6 9 12 15", "1 3 6 10 15 21", "", "10 13 16 21 30 45"], chunk_size=2)
+    (2, 114)
+    """
+    totals = [0, 0]
+    blocks = defaultdict(list)
+
+    def add_block(rows: list[list[str]]):
+        try:
+            values = np.array(rows, dtype=np.int64)
+            # the column totals have to fit in an int64 too
+            if max(-int(values.min()), int(values.max())) * len(rows) >= 2**63:
+                raise OverflowError
+            column_totals = values.sum(axis=0).tolist()
+        except OverflowError:
+            column_totals = [sum(map(int, column)) for column in zip(*rows)]
+
+        # extrapolating the column totals is the same as adding up every row's
+        before, after = extrapolate(column_totals)
+        totals[0] += before
+        totals[1] += after
+
+    for line in lines:
+        if vals := line.split():
+            block = blocks[len(vals)]
+            block.append(vals)
+            if len(block) >= chunk_size:
+                add_block(blocks.pop(len(vals)))
+
+    for block in blocks.values():
+        add_block(block)
+    return totals[0], totals[1]
 
 def part_1(rawdata):
     r"""
@@ -11,16 +77,7 @@ def part_1(rawdata):
     ... ''')
     114
     """
-    extrapolated = []
-    for line in rawdata.splitlines():
-        vals = [int(val) for val in line.split()]
-        finals = [vals[-1]]
-        while any(vals):
-            vals = [b-a for a,b in it.pairwise(vals)]
-            finals.append(vals[-1])
-
-        extrapolated.append(sum(finals))
-    return sum(extrapolated)
+    return extrapolation_sums(rawdata.splitlines())[1]
 
 def part_2(rawdata):
     r"""
@@ -31,17 +88,7 @@ def part_2(rawdata):
     ... ''')
     2
     """
-    extrapolated = []
-    for line in rawdata.splitlines():
-        vals = [int(val) for val in line.split()]
-        firsts = [vals[0]]
-        while any(vals):
-            vals = [b-a for a,b in it.pairwise(vals)]
-            firsts.append(vals[0])
-
-        extrapolated.append(reduce(lambda extra,prev:prev-extra, reversed(firsts)))
-
-    return sum(extrapolated)
+    return extrapolation_sums(rawdata.splitlines())[0]
 
 if __name__ == "__main__":
     import aocd
@@ -1,58 +1,114 @@
 #!/usr/bin/env -S pdm run python
 
-import networkx as nx
-import itertools as it
-
+from dataclasses import dataclass
+import numpy as np
+
+NORTH, EAST, SOUTH, WEST = range(4)
+PIPES = {"|": (NORTH, SOUTH), "-": (EAST, WEST), "L": (NORTH, EAST),
+         "J": (NORTH, WEST), "7": (SOUTH, WEST), "F": (SOUTH, EAST)}
+
+def opposite(direction: int) -> int:
+    return (direction + 2) % 4
+
+# TURNS[c][d] is which way we leave a `c` tile we walked into going in direction d,
+# or None if it doesn't have an opening on that side
+TURNS = [[None]*4 for _ in range(256)]
+for pipe, (a, b) in PIPES.items():
+    TURNS[ord(pipe)][opposite(a)] = b
+    TURNS[ord(pipe)][opposite(b)] = a
+
+OPENS_NORTH = np.array([TURNS[c][SOUTH] is not None for c in range(256)])
+
+@dataclass
+class PipeLoop:
+    grid: np.ndarray
+    loop: np.ndarray
+    start: tuple[int, int]
+    length: int
+    corners: list[tuple[int, int]]
+
+    @property
+    def enclosed(self) -> int:
+        """
+        How many tiles are inside the loop. The shoelace formula gives the area
+        inside the path through the middle of the loop's tiles, and Pick's theorem
+        says that is (tiles inside) + (tiles on the loop)/2 - 1.
+        """
+        twice_area = abs(sum(x1*y2 - x2*y1 for (x1, y1), (x2, y2) in zip(self.corners, self.corners[1:] + self.corners[:1])))
+        return (twice_area - self.length)//2 + 1
+
+    def inside_mask(self) -> np.ndarray:
+        """
+        Which tiles are inside the loop - scanning left to right, we cross between
+        inside and outside whenever we hit a tile of the loop that opens upward. That
+        does the right thing both for perpendicular walls, and for parallel runs -
+          eg a run of L--J flips parity twice leaving us outside, but
+                      L--7 puts us inside
+        """
+        crossings = self.loop & OPENS_NORTH[self.grid]
+        return (np.cumsum(crossings, axis=1) % 2 == 1) & ~self.loop
+
+def trace_loop(rawdata: str) -> PipeLoop:
+    r"""
+    Follows the loop round from S. The grid (with S swapped for whatever pipe
+    it has to be) and which tiles are on the loop come back as 2D arrays.
 
-def parse_map(rawdata: str):
+    >>> loop = trace_loop('''\
+    ... .....
+    ... .S-7.
+    ... .|.|.
+    ... .L-J.
+    ... .....
+    ... ''')
+    >>> loop.start, chr(loop.grid[1, 1]), loop.length, loop.corners
+    ((1, 1), 'F', 8, [(1, 1), (1, 3), (3, 3), (3, 1)])
+    >>> loop.enclosed, loop.inside_mask().sum()
+    (1, 1)
+    >>> loop.loop.astype(int)
+    array([[0, 0, 0, 0, 0],
+           [0, 1, 1, 1, 0],
+           [0, 1, 0, 1, 0],
+           [0, 1, 1, 1, 0],
+           [0, 0, 0, 0, 0]])
+    """
     data = rawdata.splitlines()
     rows, columns = len(data), len(data[0])
-    
-    tiles = {
-        "|": dict(north=True , south=True , east=False, west=False),
-        "-": dict(north=False, south=False, east=True , west=True ),
-        "L": dict(north=True , south=False, east=True , west=False),
-        "J": dict(north=True , south=False, east=False, west=True ),
-        "7": dict(north=False, south=True , east=False, west=True ),
-        "F": dict(north=False, south=True , east=True , west=False),
-        ".": dict(north=False, south=False, east=False, west=False),
-        "S": dict(north=True , south=True , east=True , west=True )
-    }
-
-    g = nx.Graph(rows=rows,columns=columns)
-
-    for x,y in it.product(range(columns),range(rows)):
-        symbol = data[y][x]
-        g.add_node((x,y), symbol=symbol, **tiles[symbol])
-        if data[y][x] == "S":
-            g.graph["start"] = (x,y)
-
-    for x,y in g.nodes:
-        here,north,south,east,west = (x,y),(x,y-1),(x,y+1),(x+1,y),(x-1,y)
-        if north in g.nodes and g.nodes[here]["north"] and g.nodes[north]["south"]:
-            g.add_edge(here, north)
-        if south in g.nodes and g.nodes[here]["south"] and g.nodes[south]["north"]:
-            g.add_edge(here, south)
-        if east in g.nodes and g.nodes[here]["east"] and g.nodes[east]["west"]:
-            g.add_edge(here,east)
-        if west in g.nodes and g.nodes[here]["west"] and g.nodes[west]["east"]:
-            g.add_edge(here,west)
-        
-    loop = g.graph["loop"] = set(it.chain.from_iterable(nx.find_cycle(g,source=g.graph["start"])))
-
-    # So far we've pretended that whatever pipe is under S has openings to all for sides,
-    # but now we have enough information to close off the ones that aren't part of the loop
-    x, y = g.graph["start"]
-    if (x,y-1) not in loop or not g.nodes[x,y-1]["south"]:
-        g.nodes[x,y]["north"] = False
-    if (x,y+1) not in loop or not g.nodes[x,y+1]["north"]:
-        g.nodes[x,y]["south"] = False
-    if (x-1,y) not in loop or not g.nodes[x-1,y]["east"]:
-        g.nodes[x,y]["west"] = False
-    if (x+1,y) not in loop or not g.nodes[x+1,y]["west"]:
-        g.nodes[x,y]["east"] = False
-
-    return g
+
+    # a border of . round the outside means we never walk off the edge
+    width = columns + 2
+    grid = bytearray(b"."*width + b"".join(b"." + line.encode() + b"." for line in data) + b"."*width)
+    steps = [-width, 1, width, -1]
+    start = grid.index(b"S")
+
+    # S is whichever pipe joins up with its neighbours - if more than one could,
+    # it's the one that leads us all the way back round
+    connected = {d for d in range(4) if TURNS[grid[start + steps[d]]][d] is not None}
+    for pipe, (direction, _) in PIPES.items():
+        if not connected.issuperset(PIPES[pipe]):
+            continue
+
+        grid[start] = ord(pipe)
+        loop = bytearray(len(grid))
+        corners = [start]
+        here, length = start, 0
+        while direction is not None:
+            loop[here] = 1
+            length += 1
+            here += steps[direction]
+            if here == start and TURNS[grid[start]][direction] is not None:
+                return PipeLoop(
+                    np.frombuffer(grid, dtype=np.uint8).reshape(rows+2, width)[1:-1, 1:-1],
+                    np.frombuffer(loop, dtype=bool).reshape(rows+2, width)[1:-1, 1:-1],
+                    ((start % width) - 1, (start // width) - 1),
+                    length,
+                    [((corner % width) - 1, (corner // width) - 1) for corner in corners])
+
+            turned = TURNS[grid[here]][direction] if here != start else None
+            if turned != direction and turned is not None:
+                corners.append(here)
+            direction = turned
+
+    raise ValueError("S isn't on a loop")
 
 def part_1(rawdata):
     r"""
@@ -74,8 +130,7 @@ def part_1(rawdata):
     ... ''')
     8
     """
-    g = parse_map(rawdata)
-    return len(g.graph["loop"])//2
+    return trace_loop(rawdata).length//2
 
 
 def part_2(rawdata):
@@ -130,28 +185,7 @@ def part_2(rawdata):
     ... ''')
     10
     """
-    g = parse_map(rawdata)
-
-    # scan left to right looking for loop crossings
-    # we cross between inside and outside when we hit an on-loop pipes opening 
-    # upward - this does the right thing both for perpendicular walls, and for parallel
-    # runs - 
-    #   eg a run of L--J flips parity twice leaving us outside, but
-    #               L--7 puts us inside
-    inside_points = set()
-    for y in range(g.graph["rows"]):
-        inside = False
-        for x in range(g.graph["columns"]):
-            if (x,y) in g.graph["loop"]:
-                if g.nodes[x,y]["north"]:
-                    inside = not inside
-            elif inside:
-                inside_points.add((x,y))
-
-    # for y in range(g.graph["rows"]):
-    #     print("".join(g.nodes[x,y]["symbol"] if (x,y) in g.graph["loop"] else "I" if (x,y) in inside_points else "O" for x in range(g.graph["columns"]) ))
-
-    return len(inside_points)
+    return trace_loop(rawdata).enclosed
 
 if __name__ == "__main__":
     import aocd
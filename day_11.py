@@ -1,6 +1,36 @@
 #!/usr/bin/env -S pdm run python
 import numpy as np
-import itertools as it
+import math
+
+def pairwise_distance_sum(coords: np.ndarray) -> int:
+    """
+    The sum of |a - b| over every pair of coordinates. Once they're sorted, the
+    i-th one is bigger than the i before it and smaller than the n-1-i after it,
+    so it gets added i times and taken away n-1-i times.
+
+    >>> pairwise_distance_sum(np.array([5, 1, 3]))
+    8
+    """
+    coords = np.sort(coords)
+    n = len(coords)
+    return math.sumprod(coords.tolist(), range(1-n, n, 2))
+
+def galaxy_distance_sum(rawdata: str, expansion_factor: int) -> int:
+    """
+    The sum of the shortest paths between every pair of galaxies. Rows and columns
+    don't interact, so each axis is done separately: every galaxy is moved along by
+    (expansion_factor - 1) for each empty line before it, and then it's just the sum
+    of the distances between pairs of numbers.
+    """
+    data = rawdata.splitlines()
+    grid = np.frombuffer("".join(data).encode(), dtype=np.uint8).reshape(len(data), -1) == ord("#")
+    rows, cols = grid.nonzero()
+
+    total = 0
+    for axis, coords in ((1, rows), (0, cols)):
+        empty_before = np.cumsum(~grid.any(axis=axis))
+        total += pairwise_distance_sum(coords + (expansion_factor-1)*empty_before[coords])
+    return total
 
 def part_1(rawdata):
     r"""
@@ -18,18 +48,7 @@ def part_1(rawdata):
     ... ''')
     374
     """
-    data = np.array([[c=="#" for c in line] for line in rawdata.splitlines()])
-
-    empty_cols = np.where(~data.any(axis=0))[0]
-    empty_rows = np.where(~data.any(axis=1))[0]
-
-    galaxies = list(zip(*data.nonzero()))
-
-    def taxicab(x1,y1,x2,y2):
-        return abs(x1-x2)+abs(y1-y2)+sum(x1 < x < x2 or x2 < x < x1 for x in empty_rows) + sum(y1 < y < y2  or y2 < y < y1 for y in empty_cols)
-
-    # breakpoint()
-    return sum(taxicab(*p1,*p2) for p1,p2 in it.combinations(galaxies,2))
+    return galaxy_distance_sum(rawdata, 2)
 
 def part_2(rawdata, expansion_factor=1_000_000):
     r"""
@@ -61,18 +80,7 @@ def part_2(rawdata, expansion_factor=1_000_000):
     ... ''', 100)
     8410
     """
-    data = np.array([[c=="#" for c in line] for line in rawdata.splitlines()])
-
-    empty_cols = np.where(~data.any(axis=0))[0]
-    empty_rows = np.where(~data.any(axis=1))[0]
-
-    galaxies = list(zip(*data.nonzero()))
-
-    def taxicab(x1,y1,x2,y2):
-        return abs(x1-x2)+abs(y1-y2)+sum(x1 < x < x2 or x2 < x < x1 for x in empty_rows)*(expansion_factor-1) + sum(y1 < y < y2  or y2 < y < y1 for y in empty_cols)*(expansion_factor-1)
-
-    # breakpoint()
-    return sum(taxicab(*p1,*p2) for p1,p2 in it.combinations(galaxies,2))
+    return galaxy_distance_sum(rawdata, expansion_factor)
 
 if __name__ == "__main__":
     import aocd